@@ -11,12 +11,25 @@ import time
 import secrets
 import getpass
 import functools
+import http.client
+import gzip
+import json
 import os
+import queue
 import string
 import mimetypes
+import urllib.error
+import urllib.request
 from urllib.parse import urlparse, unquote
-from PIL import Image
+from PIL import Image, ImageOps
 from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
             
 mimetypes.add_type('application/javascript', '.js')
 mimetypes.add_type('text/css', '.css')
@@ -27,12 +40,51 @@ app.secret_key = secrets.token_hex(16)
 
 BASE_DIR = r"D:\uv\ssss" 
 THUMBNAIL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "thumbnails")
+DERIVATIVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "derivatives")
+DOWNLOAD_STATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "downloads")
+DUPLICATE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "duplicate_hashes.json")
 ALLOWED_VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.webm', '.flv', '.wmv', '.m4v'}
 ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
 SESSION_TIMEOUT = 3600  # 1 hour
+PLACEHOLDER_THUMBNAIL = "/static/icons/placeholder.jpg"
+THUMBNAIL_WORKERS = 2  # Concurrent ffmpeg thumbnail jobs
+WATCH_INTERVAL = 2  # Seconds between directory polls for live updates
+WATCH_MAX_INTERVAL = 30  # Polling of a quiet directory backs off up to this many seconds
+WATCH_MAX_ENTRIES = 5000  # Larger directories are only rescanned, without stats, when their mtime changes
+UPLOAD_BATCH_TTL = 3600  # Seconds before an unfinished upload batch stops being tracked
+EVENT_KEEPALIVE = 15  # Seconds between keepalive comments on idle event streams
+LISTING_CACHE_SIZE = 256  # Directory listings kept in memory
+LISTING_CACHE_TTL = 30  # Seconds a cached listing is trusted while its directory is unchanged
+PREFETCH_WORKERS = 2  # Threads warming the listing cache for subfolders
+PREFETCH_LIMIT = 24  # Subfolders prefetched per listing
+PREFETCH_MAX_ENTRIES = 2000  # Subfolders with more entries than this are not prefetched
+LISTING_CACHE_MAX_ENTRIES = 200000  # Total listing entries kept across all cached listings
+MAX_BATCH_OPERATIONS = 50
+COMPRESS_MIN_SIZE = 1024  # JSON responses smaller than this are sent uncompressed
+DERIVATIVE_WIDTHS = (640, 1280, 1920, 2560)  # Viewer image widths; requests snap up to one of these
+DERIVATIVE_CACHE_SIZE = 1024 * 1024 * 1024  # 1 GB of resized viewer images on disk
+DERIVATIVE_WORKERS = 2  # Threads resizing neighbours of the viewed image
+MAX_NEIGHBOR_PREFETCH = 5
+MAX_CONCURRENT_DOWNLOADS = 3  # URL downloads running at once; the rest wait in the queue
+DOWNLOAD_SEGMENTS = 4  # Parallel Range connections per download
+DOWNLOAD_MIN_SEGMENT_SIZE = 4 * 1024 * 1024  # Files smaller than this use fewer connections
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_RETRIES = 3  # Reconnect attempts per segment, resuming where it stopped
+DOWNLOAD_TIMEOUT = 30  # Seconds without data before a connection is considered dead
+DOWNLOAD_STATE_INTERVAL = 2  # Seconds between saving download progress for resume
+DUPLICATE_WORKERS = 4  # Processes hashing files for the duplicate finder
+DUPLICATE_SAMPLE_SIZE = 64 * 1024  # Bytes hashed from each end of a file before a full hash
+DUPLICATE_HASH_CHUNK_SIZE = 1024 * 1024
+DUPLICATE_CACHE_SAVE_INTERVAL = 60  # Seconds between saving hashes during a scan, so a failed scan keeps its work
+
+# Compact listings encode each entry's kind and thumbnail state as small integers
+KIND_FOLDER, KIND_FILE, KIND_VIDEO, KIND_IMAGE = range(4)
+THUMB_NONE, THUMB_READY, THUMB_PENDING, THUMB_RESIZED = range(4)
 
-# Create thumbnail directory if it doesn't exist
+# Create thumbnail, derivative and download state directories if they don't exist
 os.makedirs(THUMBNAIL_DIR, exist_ok=True)
+os.makedirs(DERIVATIVE_DIR, exist_ok=True)
+os.makedirs(DOWNLOAD_STATE_DIR, exist_ok=True)
 
 # Authentication decorator
 def login_required(f):
@@ -161,6 +213,158 @@ def generate_image_thumbnail(image_path, output_path):
         print(f"Error generating image thumbnail: {e}")
         return False
 
+# Thumbnail name is derived from the absolute path of the media file
+def thumbnail_name(file_path):
+    return hashlib.md5(file_path.encode()).hexdigest() + ".jpg"
+
+def to_rel_path(path):
+    """Convert an absolute path into the '/'-separated form used by the API"""
+    rel_path = os.path.relpath(path, BASE_DIR).replace('\\', '/')
+    return '' if rel_path == '.' else rel_path
+
+def rel_dirname(rel_path):
+    return rel_path.rsplit('/', 1)[0] if '/' in rel_path else ''
+
+# Live update subscribers: (directory, queue) pairs, one per open event stream
+event_subscribers = []
+event_subscribers_lock = threading.Lock()
+
+def publish_event(event_type, directory, data):
+    """Push a Server-Sent Event to every client viewing the given directory"""
+    message = f"event: {event_type}\ndata: {json.dumps(data)}\n\n"
+    with event_subscribers_lock:
+        for subscribed_dir, events in event_subscribers:
+            if subscribed_dir == directory:
+                events.put(message)
+
+# Paths the app itself just created or announced, so the watcher doesn't announce them again
+app_changes = {}
+app_changes_lock = threading.Lock()
+
+def note_app_change(item_path):
+    with app_changes_lock:
+        app_changes[os.path.normpath(item_path)] = time.time()
+
+def is_app_change(item_path):
+    with app_changes_lock:
+        changed_at = app_changes.get(os.path.normpath(item_path))
+        return changed_at is not None and time.time() - changed_at < WATCH_MAX_INTERVAL * 2
+
+def publish_entry_event(event_type, item_path):
+    """Announce an added/changed/removed entry to viewers of its directory"""
+    note_app_change(item_path)
+    rel_path = to_rel_path(item_path)
+    if event_type == 'removed':
+        data = {'path': rel_path}
+    else:
+        data = build_file_entry(item_path)
+    invalidate_listing(os.path.dirname(item_path))
+    publish_event(event_type, rel_dirname(rel_path), data)
+
+# Listing cache: (kind, BASE_DIR, directory) -> (directory mtime, cached at, entry count, payload),
+# least recently used first. BASE_DIR is part of the key because payloads hold paths relative to it.
+listing_cache = OrderedDict()
+listing_cache_entries = 0
+listing_cache_lock = threading.Lock()
+prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS)
+prefetch_jobs = {}  # (kind, client) -> futures queued by that client's last prefetch
+
+def listing_size(payload):
+    return len(payload) if isinstance(payload, list) else payload.get('count', 1)
+
+def cached_listing(kind, directory, build):
+    """Return build(directory), reusing the cached result while the directory is unchanged"""
+    global listing_cache_entries
+    key = (kind, BASE_DIR, directory)
+    mtime = os.stat(directory).st_mtime
+    
+    with listing_cache_lock:
+        entry = listing_cache.get(key)
+        if entry and entry[0] == mtime and time.time() - entry[1] < LISTING_CACHE_TTL:
+            listing_cache.move_to_end(key)
+            return entry[3]
+    
+    payload = build(directory)
+    size = listing_size(payload)
+    
+    with listing_cache_lock:
+        previous = listing_cache.pop(key, None)
+        if previous:
+            listing_cache_entries -= previous[2]
+        listing_cache[key] = (mtime, time.time(), size, payload)
+        listing_cache_entries += size
+        while len(listing_cache) > 1 and (len(listing_cache) > LISTING_CACHE_SIZE
+                                          or listing_cache_entries > LISTING_CACHE_MAX_ENTRIES):
+            listing_cache_entries -= listing_cache.popitem(last=False)[1][2]
+    return payload
+
+def invalidate_listing(directory):
+    global listing_cache_entries
+    directory = os.path.normpath(directory)
+    with listing_cache_lock:
+        for key in [key for key in listing_cache if key[2] == directory]:
+            listing_cache_entries -= listing_cache.pop(key)[2]
+
+def clear_listing_cache():
+    global listing_cache_entries
+    with listing_cache_lock:
+        listing_cache.clear()
+        listing_cache_entries = 0
+
+def warm_listing(kind, directory, build):
+    try:
+        # Names are cheap to count; building entries for a huge folder is not
+        if len(os.listdir(directory)) > PREFETCH_MAX_ENTRIES:
+            return
+        cached_listing(kind, directory, build)
+    except Exception as e:
+        print(f"Error prefetching {directory}: {e}")
+
+def prefetch_listings(kind, directories, build):
+    """Warm the cache for subfolders the user is likely to open next"""
+    # The user has moved on, so prefetches this client queued for the previous folder are no longer useful
+    key = (kind, request.remote_addr)
+    with listing_cache_lock:
+        for job in prefetch_jobs.pop(key, []):
+            job.cancel()
+        prefetch_jobs[key] = [prefetch_executor.submit(warm_listing, kind, directory, build)
+                              for directory in directories[:PREFETCH_LIMIT]
+                              if not is_restricted_path(directory)]
+
+thumbnail_executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+pending_thumbnails = set()
+pending_thumbnails_lock = threading.Lock()
+
+def create_thumbnail(file_path):
+    try:
+        thumb_name = thumbnail_name(file_path)
+        thumb_path = os.path.join(THUMBNAIL_DIR, thumb_name)
+        ext = os.path.splitext(file_path)[1].lower()
+
+        if ext in ALLOWED_VIDEO_EXTENSIONS:
+            if generate_thumbnail(file_path, thumb_path):
+                invalidate_listing(os.path.dirname(file_path))
+                
+                # Let open grids swap the placeholder for the real thumbnail
+                rel_path = to_rel_path(file_path)
+                publish_event('thumbnail', rel_dirname(rel_path), {
+                    'path': rel_path,
+                    'thumbnail': f"/api/thumbnail/{thumb_name}"
+                })
+        else:
+            generate_image_thumbnail(file_path, thumb_path)
+    finally:
+        with pending_thumbnails_lock:
+            pending_thumbnails.discard(file_path)
+
+def queue_thumbnail(file_path):
+    """Schedule thumbnail generation unless a job for this file is already pending"""
+    with pending_thumbnails_lock:
+        if file_path in pending_thumbnails:
+            return None
+        pending_thumbnails.add(file_path)
+    return thumbnail_executor.submit(create_thumbnail, file_path)
+
 # Background thumbnail generator
 def thumbnail_generator_thread():
     while True:
@@ -170,22 +374,126 @@ def thumbnail_generator_thread():
                     file_ext = os.path.splitext(file)[1].lower()
                     if file_ext in ALLOWED_VIDEO_EXTENSIONS or file_ext in ALLOWED_IMAGE_EXTENSIONS:
                         file_path = os.path.join(root, file)
-                        # Generate a unique thumbnail name based on the file path
-                        thumb_name = hashlib.md5(file_path.encode()).hexdigest() + ".jpg"
-                        thumb_path = os.path.join(THUMBNAIL_DIR, thumb_name)
+                        thumb_path = os.path.join(THUMBNAIL_DIR, thumbnail_name(file_path))
                         
                         # Generate thumbnail if it doesn't exist
                         if not os.path.exists(thumb_path):
-                            if file_ext in ALLOWED_VIDEO_EXTENSIONS:
-                                generate_thumbnail(file_path, thumb_path)
-                            else:
-                                generate_image_thumbnail(file_path, thumb_path)
+                            job = queue_thumbnail(file_path)
+                            if job:
+                                job.result()
         except Exception as e:
             print(f"Error in thumbnail generator thread: {e}")
         
         # Sleep for 60 seconds before checking again
         time.sleep(60)
 
+def snapshot_directory(target_dir):
+    """Map entry names to (is_dir, size, mtime), or to None when the directory is too large to stat"""
+    with os.scandir(target_dir) as entries:
+        entries = list(entries)
+    
+    if len(entries) > WATCH_MAX_ENTRIES:
+        # Names alone are enough to see additions and removals in huge folders
+        return {entry.name: None for entry in entries}
+    
+    snapshot = {}
+    for entry in entries:
+        try:
+            stat = entry.stat()
+            snapshot[entry.name] = (entry.is_dir(), stat.st_size, stat.st_mtime)
+        except OSError:
+            continue
+    return snapshot
+
+def watch_directory(target_dir, state):
+    """Poll one directory and publish its changes; returns whether anything changed"""
+    mtime = os.stat(target_dir).st_mtime
+    
+    # Huge directories are only rescanned when entries were added or removed
+    if state.get('large') and state.get('mtime') == mtime:
+        return False
+    
+    snapshot = snapshot_directory(target_dir)
+    previous = state.get('snapshot')
+    state.update(snapshot=snapshot, mtime=mtime,
+                 large=any(value is None for value in snapshot.values()))
+    if previous is None:
+        return False
+    
+    changes = [('added', name) for name in snapshot.keys() - previous.keys()]
+    changes += [('removed', name) for name in previous.keys() - snapshot.keys()]
+    changes += [('changed', name) for name in snapshot.keys() & previous.keys()
+                if None not in (snapshot[name], previous[name]) and snapshot[name] != previous[name]]
+    
+    for event_type, name in changes:
+        item_path = os.path.join(target_dir, name)
+        if event_type != 'removed' and is_app_change(item_path):
+            continue
+        try:
+            publish_entry_event(event_type, item_path)
+        except OSError:
+            # The entry vanished again before it could be described
+            continue
+    return bool(changes)
+
+# Poll the directories that clients are viewing and push changes made outside the app
+def directory_watcher_thread():
+    states = {}
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        with event_subscribers_lock:
+            watched = {directory for directory, _ in event_subscribers}
+        
+        now = time.time()
+        current = {}
+        for directory in watched:
+            target_dir = os.path.normpath(os.path.join(BASE_DIR, directory))
+            state = states.get(target_dir, {'interval': WATCH_INTERVAL, 'next_check': 0})
+            current[target_dir] = state
+            if now < state['next_check']:
+                continue
+            
+            try:
+                changed = watch_directory(target_dir, state)
+            except OSError:
+                continue
+            except Exception as e:
+                print(f"Error in directory watcher thread: {e}")
+                continue
+            
+            # Poll quiet directories less and less often, and busy ones at the base rate
+            state['interval'] = WATCH_INTERVAL if changed else min(state['interval'] * 2, WATCH_MAX_INTERVAL)
+            state['next_check'] = now + state['interval']
+        states = current
+        
+        with app_changes_lock:
+            for path in [path for path, changed_at in app_changes.items() if now - changed_at > WATCH_MAX_INTERVAL * 2]:
+                del app_changes[path]
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON API responses with brotli or gzip, as the client accepts"""
+    if (response.mimetype != 'application/json' or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    
+    encodings = ['br', 'gzip'] if brotli else ['gzip']
+    encoding = request.accept_encodings.best_match(encodings)
+    if encoding == 'br':
+        response.set_data(brotli.compress(data, quality=5))
+    elif encoding == 'gzip':
+        response.set_data(gzip.compress(data, compresslevel=5))
+    else:
+        return response
+    
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     error = None
@@ -230,104 +538,149 @@ def download_file(filename):
         as_attachment=True,
         download_name=file
     )
-@app.route('/api/stats')
-@login_required
-def get_stats():
-    try:
-        video_count = 0
-        image_count = 0
+def build_file_entry(item_path, queue_thumbnails=True):
+    """Describe a directory entry the way the file grid expects it"""
+    item = os.path.basename(item_path)
+    rel_path = to_rel_path(item_path)
+    
+    is_dir = os.path.isdir(item_path)
+    file_type = 'folder' if is_dir else 'file'
+    
+    # Get file size in MB
+    size = None
+    if not is_dir:
+        size = round(os.path.getsize(item_path) / (1024 * 1024), 2)
+    
+    # Determine file type and thumbnail
+    ext = os.path.splitext(item)[1].lower()
+    is_video = ext in ALLOWED_VIDEO_EXTENSIONS
+    is_image = ext in ALLOWED_IMAGE_EXTENSIONS
+    thumbnail = None
+    
+    if is_video:
+        thumb_name = thumbnail_name(item_path)
+        thumb_path = os.path.join(THUMBNAIL_DIR, thumb_name)
         
-        # Use the current directory from the request or default to root
-        path = request.args.get('path', '')
+        # Check if thumbnail exists
+        if os.path.exists(thumb_path):
+            thumbnail = f"/api/thumbnail/{thumb_name}"
+        else:
+            # Generate in the background; the grid is told over /api/events when it's ready
+            if queue_thumbnails:
+                queue_thumbnail(item_path)
+            thumbnail = PLACEHOLDER_THUMBNAIL
+    elif is_image:
+        # For images, use the image file directly as the thumbnail
+        thumbnail = f"/api/image/{rel_path}?thumbnail=true"
+    
+    return {
+        'name': item,
+        'path': rel_path,
+        'type': file_type,
+        'is_video': is_video,
+        'is_image': is_image,
+        'size': size,
+        'extension': ext[1:] if ext else '',
+        'thumbnail': thumbnail
+    }
+
+def build_file_items(target_dir):
+    """Build a sorted listing; thumbnails are queued only when a listing is actually opened"""
+    items = []
+    
+    for item in os.listdir(target_dir):
+        items.append(build_file_entry(os.path.join(target_dir, item), queue_thumbnails=False))
+    
+    # Sort: directories first, then files
+    items.sort(key=lambda x: (0 if x['type'] == 'folder' else 1, x['name'].lower()))
+    return items
+
+def build_compact_items(target_dir):
+    """Column-oriented form of a listing: one array per field instead of one dict per entry"""
+    items = cached_listing('files', target_dir, build_file_items)
+    kinds, names, sizes, extensions, thumbs = [], [], [], [], []
+    thumb_names = {}
+    
+    for index, item in enumerate(items):
+        if item['type'] == 'folder':
+            kind = KIND_FOLDER
+        elif item['is_video']:
+            kind = KIND_VIDEO
+        elif item['is_image']:
+            kind = KIND_IMAGE
+        else:
+            kind = KIND_FILE
+        
+        thumb = THUMB_NONE
+        if kind == KIND_VIDEO:
+            if item['thumbnail'].startswith('/api/thumbnail/'):
+                thumb = THUMB_READY
+                thumb_names[index] = item['thumbnail'].rsplit('/', 1)[1]
+            else:
+                thumb = THUMB_PENDING
+        elif kind == KIND_IMAGE:
+            thumb = THUMB_RESIZED
+        
+        kinds.append(kind)
+        names.append(item['name'])
+        sizes.append(item['size'])
+        extensions.append(item['extension'])
+        thumbs.append(thumb)
+    
+    return {
+        'count': len(items),
+        'kind': kinds,
+        'name': names,
+        'size': sizes,
+        'extension': extensions,
+        'thumb': thumbs,
+        'thumb_names': thumb_names
+    }
+
+def read_stats(path):
+    """Count media in a directory; returns (payload, status)"""
+    try:
         target_dir = os.path.normpath(os.path.join(BASE_DIR, path))
         
         # Prevent directory traversal attacks
         if not target_dir.startswith(BASE_DIR):
-            return jsonify({"error": "Access denied"}), 403
-            
-        # Count videos and images in the current directory
-        for item in os.listdir(target_dir):
-            item_path = os.path.join(target_dir, item)
-            if not os.path.isdir(item_path):
-                ext = os.path.splitext(item)[1].lower()
-                if ext in ALLOWED_VIDEO_EXTENSIONS:
-                    video_count += 1
-                elif ext in ALLOWED_IMAGE_EXTENSIONS:
-                    image_count += 1
+            return {"error": "Access denied"}, 403
         
-        return jsonify({
+        # Count videos and images from the (usually cached) listing
+        items = cached_listing('files', target_dir, build_file_items)
+        files = [item for item in items if item['type'] != 'folder']
+        video_count = sum(1 for item in files if item['is_video'])
+        image_count = sum(1 for item in files if item['is_image'])
+        
+        return {
             "video_count": video_count,
             "image_count": image_count,
             "total_media": video_count + image_count
-        })
+        }, 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
-@app.route('/api/files')
-@login_required
-def list_files():
-    path = request.args.get('path', '')
-    
+def read_file_listing(path, prefetch=False, compact=False):
+    """List a directory relative to BASE_DIR; returns (payload, status)"""
     # Prevent directory traversal attacks
     target_dir = os.path.normpath(os.path.join(BASE_DIR, path))
     if not target_dir.startswith(BASE_DIR):
-        return jsonify({"error": "Access denied"}), 403
+        return {"error": "Access denied"}, 403
     
     if is_restricted_path(target_dir):
-        return jsonify({"error": "Access denied"}), 403
+        return {"error": "Access denied"}, 403
 
     try:
-        items = []
-        
-        for item in os.listdir(target_dir):
-            item_path = os.path.join(target_dir, item)
-            rel_path = os.path.relpath(item_path, BASE_DIR).replace('\\', '/')
-            
-            is_dir = os.path.isdir(item_path)
-            file_type = 'folder' if is_dir else 'file'
-            
-            # Get file size in MB
-            size = None
-            if not is_dir:
-                size = round(os.path.getsize(item_path) / (1024 * 1024), 2)
-            
-            # Determine file type and thumbnail
-            ext = os.path.splitext(item)[1].lower()
-            is_video = ext in ALLOWED_VIDEO_EXTENSIONS
-            is_image = ext in ALLOWED_IMAGE_EXTENSIONS
-            thumbnail = None
-            
-            if is_video:
-                # Generate thumbnail name for video
-                thumb_name = hashlib.md5(item_path.encode()).hexdigest() + ".jpg"
-                thumb_path = os.path.join(THUMBNAIL_DIR, thumb_name)
-                
-                # Check if thumbnail exists
-                if os.path.exists(thumb_path):
-                    thumbnail = f"/api/thumbnail/{thumb_name}"
-                else:
-                    # Generate thumbnail synchronously for videos to show immediately
-                    if generate_thumbnail(item_path, thumb_path):
-                        thumbnail = f"/api/thumbnail/{thumb_name}"
-                    else:
-                        thumbnail = "/static/icons/placeholder.jpg"
-            elif is_image:
-                # For images, use the image file directly as the thumbnail
-                thumbnail = f"/api/image/{rel_path}?thumbnail=true"
-            
-            items.append({
-                'name': item,
-                'path': rel_path,
-                'type': file_type,
-                'is_video': is_video,
-                'is_image': is_image,
-                'size': size,
-                'extension': ext[1:] if ext else '',
-                'thumbnail': thumbnail
-            })
+        items = cached_listing('files', target_dir, build_file_items)
+        
+        # Generate missing video thumbnails for the folder the user is looking at
+        for item in items:
+            if item['is_video'] and item['thumbnail'] == PLACEHOLDER_THUMBNAIL:
+                queue_thumbnail(os.path.join(BASE_DIR, item['path']))
         
-        # Sort: directories first, then files
-        items.sort(key=lambda x: (0 if x['type'] == 'folder' else 1, x['name'].lower()))
+        if prefetch:
+            subfolders = [os.path.join(BASE_DIR, item['path']) for item in items if item['type'] == 'folder']
+            prefetch_listings('files', subfolders, build_file_items)
         
         # Get parent directory
         parent = None
@@ -338,15 +691,87 @@ def list_files():
         current_path = path.split('/') if path else []
         if current_path and current_path[-1] == '':
             current_path.pop()
+        
+        if compact:
+            rel_dir = to_rel_path(target_dir)
+            return {
+                'format': 'compact',
+                'prefix': rel_dir + '/' if rel_dir else '',
+                **cached_listing('compact', target_dir, build_compact_items),
+                'parent': parent,
+                'current_path': current_path,
+                'current_dir': path
+            }, 200
             
-        return jsonify({
+        return {
             'items': items,
             'parent': parent,
             'current_path': current_path,
             'current_dir': path
-        })
+        }, 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+def read_metadata(path):
+    """Describe a single entry, including its thumbnail state; returns (payload, status)"""
+    target = os.path.normpath(os.path.join(BASE_DIR, path))
+    if not target.startswith(BASE_DIR):
+        return {"error": "Access denied"}, 403
+    
+    if not os.path.exists(target):
+        return {"error": "Not found"}, 404
+    
+    try:
+        return build_file_entry(target), 200
+    except Exception as e:
+        return {"error": str(e)}, 500
+
+@app.route('/api/stats')
+@login_required
+def get_stats():
+    payload, status = read_stats(request.args.get('path', ''))
+    return jsonify(payload), status
+
+@app.route('/api/files')
+@login_required
+def list_files():
+    path = request.args.get('path', '')
+    prefetch = request.args.get('prefetch', 'false').lower() == 'true'
+    compact = request.args.get('format') == 'compact'
+    payload, status = read_file_listing(path, prefetch, compact)
+    return jsonify(payload), status
+
+@app.route('/api/events')
+@login_required
+def stream_events():
+    path = request.args.get('path', '')
+    
+    # Prevent directory traversal attacks
+    target_dir = os.path.normpath(os.path.join(BASE_DIR, path))
+    if not target_dir.startswith(BASE_DIR):
+        return jsonify({"error": "Access denied"}), 403
+    
+    subscription = (to_rel_path(target_dir), queue.Queue())
+    with event_subscribers_lock:
+        event_subscribers.append(subscription)
+    
+    def generate():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield subscription[1].get(timeout=EVENT_KEEPALIVE)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing the stream and detects gone clients
+                    yield ": keepalive\n\n"
+        finally:
+            with event_subscribers_lock:
+                event_subscribers.remove(subscription)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/api/media/<path:filename>')
 @login_required
@@ -403,6 +828,148 @@ def serve_media(filename):
 def stream_video(filename):
     return serve_media(filename)
 
+def snap_width(width):
+    """Round a requested width up to the nearest derivative bucket"""
+    for bucket in DERIVATIVE_WIDTHS:
+        if width <= bucket:
+            return bucket
+    return DERIVATIVE_WIDTHS[-1]
+
+def derivative_path(image_path, width):
+    # Include size and mtime so an edited original never matches a stale derivative
+    stat = os.stat(image_path)
+    key = f"{image_path}:{stat.st_size}:{stat.st_mtime_ns}:{width}"
+    return os.path.join(DERIVATIVE_DIR, hashlib.md5(key.encode()).hexdigest() + ".jpg")
+
+derivative_executor = ThreadPoolExecutor(max_workers=DERIVATIVE_WORKERS)
+pending_derivatives = {}  # (image path, width) -> Event set when that resize finishes
+pending_derivatives_lock = threading.Lock()
+derivative_cache_lock = threading.Lock()
+derivative_cache_bytes = None  # Total size on disk, measured on first use
+
+def generate_derivative(image_path, width, output_path):
+    """Write an EXIF-oriented progressive JPEG no wider than width; False if no downscale is needed"""
+    with Image.open(image_path) as img:
+        # Check the displayed width from the header before decoding any pixels
+        orientation = img.getexif().get(0x0112, 1)
+        displayed_width = img.height if orientation in (5, 6, 7, 8) else img.width
+        if displayed_width <= width:
+            return False
+        
+        # A JPEG would keep only the first frame of an animated GIF or WebP
+        if getattr(img, 'is_animated', False):
+            return False
+
+        # Let the JPEG decoder downscale while decoding, which is much faster than a full decode
+        img.draft('RGB', (width, width))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((width, width * 4), Image.LANCZOS)
+        
+        if img.mode in ('RGBA', 'LA', 'P'):
+            # Flatten transparency onto white instead of letting it turn black
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+        
+        # Write to a temporary name so readers never see a half-written file
+        temp_path = f"{output_path}.{threading.get_ident()}.tmp"
+        try:
+            img.save(temp_path, format='JPEG', quality=85, progressive=True, optimize=True)
+            replaced_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+            os.replace(temp_path, output_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    record_derivative(output_path, os.path.getsize(output_path) - replaced_size)
+    return True
+
+def record_derivative(new_path, added_bytes):
+    """Account for a written derivative and evict least recently used ones over the size limit"""
+    global derivative_cache_bytes
+    with derivative_cache_lock:
+        if derivative_cache_bytes is None:
+            derivative_cache_bytes = sum(entry.stat().st_size for entry in os.scandir(DERIVATIVE_DIR) if entry.is_file())
+        else:
+            derivative_cache_bytes += added_bytes
+        
+        if derivative_cache_bytes <= DERIVATIVE_CACHE_SIZE:
+            return
+        
+        # mtime is bumped on every cache hit, so oldest mtime is least recently used
+        entries = sorted((entry for entry in os.scandir(DERIVATIVE_DIR) if entry.is_file()),
+                         key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if derivative_cache_bytes <= DERIVATIVE_CACHE_SIZE:
+                break
+            if entry.path == new_path:
+                continue
+            try:
+                entry_size = entry.stat().st_size
+                os.remove(entry.path)
+                derivative_cache_bytes -= entry_size
+            except OSError:
+                continue
+
+def get_derivative(image_path, width):
+    """Return the cached derivative for image_path at width, creating it if needed; None means use the original"""
+    output_path = derivative_path(image_path, width)
+    key = (image_path, width)
+    
+    while True:
+        if os.path.exists(output_path):
+            os.utime(output_path)
+            return output_path
+        
+        with pending_derivatives_lock:
+            in_flight = pending_derivatives.get(key)
+            if in_flight is None:
+                pending_derivatives[key] = threading.Event()
+                break
+        
+        # Another request or a neighbour prefetch is already resizing this image; use its result
+        in_flight.wait()
+    
+    try:
+        if generate_derivative(image_path, width, output_path):
+            return output_path
+        return None
+    finally:
+        with pending_derivatives_lock:
+            pending_derivatives.pop(key).set()
+
+def create_derivative(image_path, width):
+    try:
+        get_derivative(image_path, width)
+    except Exception as e:
+        print(f"Error generating derivative for {image_path}: {e}")
+
+def queue_derivative(image_path, width):
+    with pending_derivatives_lock:
+        if (image_path, width) in pending_derivatives:
+            return
+    derivative_executor.submit(create_derivative, image_path, width)
+
+def prefetch_neighbor_derivatives(image_path, width, count):
+    """Resize the images next to image_path in the listing so paging through the viewer is instant"""
+    directory = os.path.dirname(image_path)
+    items = cached_listing('files', directory, build_file_items)
+    images = [os.path.join(directory, item['name']) for item in items
+              if item['type'] != 'folder' and item['is_image']]
+    
+    if image_path not in images:
+        return
+    
+    index = images.index(image_path)
+    for offset in range(1, count + 1):
+        for neighbor in (index + offset, index - offset):
+            if 0 <= neighbor < len(images):
+                queue_derivative(images[neighbor], width)
+
 @app.route('/api/image/<path:filename>')
 @login_required
 def serve_image(filename):
@@ -440,6 +1007,24 @@ def serve_image(filename):
         except Exception as e:
             print(f"Error serving thumbnail: {e}")
             return send_file(target_file)
+    elif request.args.get('w', '').isdigit():
+        # Send a screen-sized derivative instead of the full-resolution original
+        width = snap_width(int(request.args['w']))
+        
+        try:
+            neighbors = min(int(request.args.get('neighbors', 0)), MAX_NEIGHBOR_PREFETCH)
+            if neighbors > 0:
+                prefetch_neighbor_derivatives(target_file, width, neighbors)
+        except Exception as e:
+            print(f"Error prefetching neighbor derivatives: {e}")
+        
+        try:
+            derivative = get_derivative(target_file, width)
+            if derivative:
+                return send_file(derivative, mimetype='image/jpeg')
+        except Exception as e:
+            print(f"Error serving derivative: {e}")
+        return send_file(target_file)
     else:
         # Send original image
         return send_file(target_file)
@@ -453,6 +1038,55 @@ def get_thumbnail(filename):
 def serve_static(filename):
     return send_from_directory('static', filename)
 
+def make_dirs_and_notify(path):
+    """Create a directory tree and announce every folder that did not exist yet"""
+    missing = []
+    current = path
+    while not os.path.exists(current):
+        missing.append(current)
+        parent = os.path.dirname(current)
+        if parent == current:
+            break
+        current = parent
+    
+    os.makedirs(path, exist_ok=True)
+    for created in reversed(missing):
+        publish_entry_event('added', created)
+
+# Files received so far per client upload batch: batch id -> (count, last update)
+upload_batches = {}
+upload_batches_lock = threading.Lock()
+
+def record_upload_progress(uploaded_files):
+    """Count this request's files towards the client's batch and report it to the folder being viewed"""
+    batch_id = request.form.get('batch_id')
+    batch_total = request.form.get('batch_total', '')
+    current_dir = request.form.get('current_dir', '')
+    if not batch_id or not batch_total.isdigit():
+        return
+    
+    # Only report to folders inside BASE_DIR
+    viewed_dir = os.path.normpath(os.path.join(BASE_DIR, current_dir))
+    if not viewed_dir.startswith(BASE_DIR):
+        return
+    
+    now = time.time()
+    with upload_batches_lock:
+        for stale in [key for key, (_, updated) in upload_batches.items() if now - updated > UPLOAD_BATCH_TTL]:
+            del upload_batches[stale]
+        
+        received = upload_batches.get(batch_id, (0, now))[0] + len(uploaded_files)
+        if received >= int(batch_total):
+            upload_batches.pop(batch_id, None)
+        else:
+            upload_batches[batch_id] = (received, now)
+    
+    publish_event('upload', to_rel_path(viewed_dir), {
+        'name': uploaded_files[-1] if uploaded_files else '',
+        'received': received,
+        'total': int(batch_total)
+    })
+
 @app.route('/api/upload', methods=['POST'])
 @login_required
 def upload_file():
@@ -476,7 +1110,7 @@ def upload_file():
             return jsonify({"error": "Cannot upload to system directories"}), 403
         
         # Create uploads directory if it doesn't exist
-        os.makedirs(target_dir, exist_ok=True)
+        make_dirs_and_notify(target_dir)
         
         if 'file' not in request.files:
             return jsonify({"error": "No file part"}), 400
@@ -497,7 +1131,7 @@ def upload_file():
                 rel_path = os.path.dirname(original_filename)
                 # Create subfolder structure
                 subfolder_path = os.path.normpath(os.path.join(target_dir, rel_path))
-                os.makedirs(subfolder_path, exist_ok=True)
+                make_dirs_and_notify(subfolder_path)
                 
                 # Use the original filename but secure it
                 filename = os.path.basename(original_filename)
@@ -513,19 +1147,19 @@ def upload_file():
                 filepath = os.path.join(target_dir, filename)
                 
             # Save the file
+            note_app_change(filepath)
             file.save(filepath)
             uploaded_files.append(filename)
             
+            # Tell viewers of the target folder about the new file
+            publish_entry_event('added', filepath)
+            
             # If it's a media file, trigger thumbnail generation
             ext = os.path.splitext(filename)[1].lower()
             if ext in ALLOWED_VIDEO_EXTENSIONS or ext in ALLOWED_IMAGE_EXTENSIONS:
-                thumb_name = hashlib.md5(filepath.encode()).hexdigest() + ".jpg"
-                thumb_path = os.path.join(THUMBNAIL_DIR, thumb_name)
-                
-                if ext in ALLOWED_VIDEO_EXTENSIONS:
-                    threading.Thread(target=generate_thumbnail, args=(filepath, thumb_path)).start()
-                else:
-                    threading.Thread(target=generate_image_thumbnail, args=(filepath, thumb_path)).start()
+                queue_thumbnail(filepath)
+        
+        record_upload_progress(uploaded_files)
         
         return jsonify({
             "success": True,
@@ -538,11 +1172,23 @@ def upload_file():
         return jsonify({"error": str(e)}), 500
     
 
-@app.route('/api/directories')
-@login_required
-def list_directories():
-    path = request.args.get('path', '')
+def build_directory_items(path):
+    directories = []
+    for item in os.listdir(path):
+        item_path = os.path.join(path, item)
+        if os.path.isdir(item_path):
+            directories.append({
+                'name': item,
+                'path': item_path,
+                'type': 'directory'
+            })
     
+    # Sort directories by name
+    directories.sort(key=lambda x: x['name'].lower())
+    return directories
+
+def read_directories(path, prefetch=False):
+    """List folders of an absolute path for the directory selector; returns (payload, status)"""
     try:
         # If path is empty, list drives on Windows or root directory on other systems
         if not path:
@@ -553,22 +1199,22 @@ def list_directories():
                     drive = f"{letter}:\\"
                     if os.path.exists(drive):
                         drives.append(drive)
-                return jsonify({
+                return {
                     'drives': drives,
                     'parent': None,
                     'current_path': [],
                     'directories': []
-                })
+                }, 200
             else:
                 # For Unix-like systems, start at root
                 path = "/"
         
         # Check if the path exists
         if not os.path.exists(path):
-            return jsonify({"error": f"Path does not exist: {path}"}), 404
+            return {"error": f"Path does not exist: {path}"}, 404
         
         if is_restricted_path(path):
-            return jsonify({"error": "Access denied"}), 403
+            return {"error": "Access denied"}, 403
         # Get parent directory
         parent = os.path.dirname(path) if path and path != "/" else None
         
@@ -577,19 +1223,11 @@ def list_directories():
             parent = ''
             
         # List directories at the current path
-        directories = []
         try:
-            for item in os.listdir(path):
-                item_path = os.path.join(path, item)
-                if os.path.isdir(item_path):
-                    directories.append({
-                        'name': item,
-                        'path': item_path,
-                        'type': 'directory'
-                    })
-            
-            # Sort directories by name
-            directories.sort(key=lambda x: x['name'].lower())
+            directories = cached_listing('directories', os.path.normpath(path), build_directory_items)
+            
+            if prefetch:
+                prefetch_listings('directories', [d['path'] for d in directories], build_directory_items)
             
             # Format current path for breadcrumb
             if platform.system() == 'Windows':
@@ -612,15 +1250,57 @@ def list_directories():
                 # For Unix systems, split by forward slash
                 path_parts = [p for p in path.split('/') if p]
                 
-            return jsonify({
+            return {
                 'directories': directories,
                 'parent': parent,
                 'current_path': path_parts
-            })
+            }, 200
         except PermissionError:
-            return jsonify({"error": "Permission denied"}), 403
+            return {"error": "Permission denied"}, 403
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
+
+@app.route('/api/directories')
+@login_required
+def list_directories():
+    path = request.args.get('path', '')
+    prefetch = request.args.get('prefetch', 'false').lower() == 'true'
+    payload, status = read_directories(path, prefetch)
+    return jsonify(payload), status
+
+# Operations accepted by /api/batch, each returning (payload, status)
+BATCH_OPERATIONS = {
+    'files': lambda op: read_file_listing(op.get('path', ''), op.get('prefetch') is True, op.get('format') == 'compact'),
+    'stats': lambda op: read_stats(op.get('path', '')),
+    'metadata': lambda op: read_metadata(op.get('path', '')),
+    'directories': lambda op: read_directories(op.get('path', ''), op.get('prefetch') is True)
+}
+
+@app.route('/api/batch', methods=['POST'])
+@login_required
+def batch():
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "No operations provided"}), 400
+    
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({"error": f"At most {MAX_BATCH_OPERATIONS} operations per batch"}), 400
+    
+    results = []
+    for op in operations:
+        handler = BATCH_OPERATIONS.get(op.get('op')) if isinstance(op, dict) else None
+        if handler is None:
+            results.append({"status": 400, "data": {"error": "Unknown operation"}})
+            continue
+        if not isinstance(op.get('path', ''), str) or not isinstance(op.get('format', ''), str):
+            results.append({"status": 400, "data": {"error": "path and format must be strings"}})
+            continue
+        payload, status = handler(op)
+        results.append({"status": status, "data": payload})
+    
+    return jsonify({"results": results})
 
 def is_restricted_path(path):
     """Check if a path is restricted from user access"""
@@ -675,6 +1355,7 @@ def change_directory():
         # Update the BASE_DIR global variable
         global BASE_DIR
         BASE_DIR = new_path
+        clear_listing_cache()
         
         return jsonify({
             "success": True,
@@ -684,6 +1365,281 @@ def change_directory():
         return jsonify({"error": str(e)}), 500
     
 
+# URL download jobs by id; each job is a JSON-serializable dict so it can be saved for resume
+download_jobs = {}
+download_cancel_events = {}
+download_jobs_lock = threading.Lock()
+download_state_lock = threading.RLock()  # Serializes writes of the per-job state files
+download_executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+
+def download_request(url, start=None, end=None):
+    headers = {'User-Agent': 'LocalFileExplorer'}
+    if start is not None:
+        headers['Range'] = f"bytes={start}-{'' if end is None else end}"
+    return urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=DOWNLOAD_TIMEOUT)
+
+def probe_download(url):
+    """Return (total size or None, whether the server honours Range requests)"""
+    try:
+        with download_request(url, 0, 0) as response:
+            if response.status == 206:
+                total = response.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+                if total.isdigit():
+                    return int(total), True
+            length = response.headers.get('Content-Length', '')
+            return (int(length) if length.isdigit() else None), False
+    except urllib.error.HTTPError as e:
+        # 416 means the file is empty, so there is nothing to split
+        if e.code == 416:
+            return None, False
+        raise
+
+def plan_segments(total, ranged):
+    if not ranged or not total:
+        return [{'start': 0, 'end': None, 'done': 0}]
+    
+    count = max(1, min(DOWNLOAD_SEGMENTS, total // DOWNLOAD_MIN_SEGMENT_SIZE))
+    size = total // count
+    return [{
+        'start': i * size,
+        'end': total - 1 if i == count - 1 else (i + 1) * size - 1,
+        'done': 0
+    } for i in range(count)]
+
+def save_download_state(job_id):
+    with download_state_lock:
+        with download_jobs_lock:
+            job = download_jobs[job_id]
+            job['saved_at'] = time.time()
+            state = json.dumps(job)
+        
+        state_path = os.path.join(DOWNLOAD_STATE_DIR, f"{job_id}.json")
+        with open(state_path + '.tmp', 'w') as f:
+            f.write(state)
+        os.replace(state_path + '.tmp', state_path)
+
+def save_download_progress(job_id):
+    """Save resume state if the last save is old enough; a failed save never interrupts the transfer"""
+    with download_state_lock:
+        with download_jobs_lock:
+            if time.time() - download_jobs[job_id]['saved_at'] <= DOWNLOAD_STATE_INTERVAL:
+                return
+        try:
+            save_download_state(job_id)
+        except OSError as e:
+            print(f"Error saving download state for {job_id}: {e}")
+
+def remove_download_state(job_id):
+    state_path = os.path.join(DOWNLOAD_STATE_DIR, f"{job_id}.json")
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+def download_segment(job_id, index, part_path):
+    """Stream one byte range of a download into its place in the .part file"""
+    cancel = download_cancel_events[job_id]
+    
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        with download_jobs_lock:
+            job = download_jobs[job_id]
+            segment = job['segments'][index]
+            if not job['ranged']:
+                # Without Range support the transfer can only restart from the beginning
+                segment['done'] = 0
+            start = segment['start'] + segment['done']
+            end = segment['end']
+        
+        if end is not None and start > end:
+            return
+        
+        try:
+            response = download_request(job['url'], start, end) if job['ranged'] else download_request(job['url'])
+            with response, open(part_path, 'r+b') as f:
+                if job['ranged'] and response.status != 206:
+                    raise IOError("Server ignored the Range request")
+                
+                f.seek(start)
+                if not job['ranged']:
+                    f.truncate()
+                
+                while not cancel.is_set():
+                    chunk = response.read(DOWNLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    
+                    with download_jobs_lock:
+                        segment['done'] += len(chunk)
+                    save_download_progress(job_id)
+            
+            if cancel.is_set():
+                return
+            
+            # A closed connection reads as end of data, so check that every expected byte arrived
+            expected_end = end if end is not None else (job['total'] - 1 if job['total'] else None)
+            if expected_end is not None and segment['start'] + segment['done'] <= expected_end:
+                raise IOError("Connection closed before the segment was complete")
+            return
+        except (OSError, http.client.HTTPException) as e:
+            if attempt == DOWNLOAD_RETRIES or cancel.is_set():
+                raise
+            print(f"Retrying download {job_id} segment {index}: {e}")
+            time.sleep(2 ** attempt)
+
+def run_download(job_id):
+    cancel = download_cancel_events[job_id]
+    with download_jobs_lock:
+        job = download_jobs[job_id]
+        if cancel.is_set():
+            return
+        job['status'] = 'downloading'
+        job['error'] = None
+    part_path = job['path'] + '.part'
+    
+    try:
+        if job['segments'] is None:
+            total, ranged = probe_download(job['url'])
+            with download_jobs_lock:
+                job.update(total=total, ranged=ranged, segments=plan_segments(total, ranged))
+        
+        if not os.path.exists(part_path):
+            with download_jobs_lock:
+                for segment in job['segments']:
+                    segment['done'] = 0
+            # Reserve the full size up front so segments can write at their offsets
+            with open(part_path, 'wb') as f:
+                if job['ranged']:
+                    f.truncate(job['total'])
+        save_download_state(job_id)
+        
+        with ThreadPoolExecutor(max_workers=len(job['segments'])) as segment_pool:
+            segment_jobs = [segment_pool.submit(download_segment, job_id, index, part_path)
+                            for index in range(len(job['segments']))]
+            for segment_job in segment_jobs:
+                segment_job.result()
+        
+        if cancel.is_set():
+            discard_download(job_id)
+            return
+        
+        os.replace(part_path, job['path'])
+        remove_download_state(job_id)
+        with download_jobs_lock:
+            job['status'] = 'completed'
+        
+        # Show the file in open grids and hand media to the thumbnail workers
+        publish_entry_event('added', job['path'])
+        ext = os.path.splitext(job['path'])[1].lower()
+        if ext in ALLOWED_VIDEO_EXTENSIONS or ext in ALLOWED_IMAGE_EXTENSIONS:
+            queue_thumbnail(job['path'])
+    except Exception as e:
+        print(f"Error downloading {job['url']}: {e}")
+        if cancel.is_set():
+            discard_download(job_id)
+            return
+        with download_jobs_lock:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        # Keep the .part file and state so the job can be resumed
+        save_download_state(job_id)
+
+def discard_download(job_id):
+    with download_jobs_lock:
+        job = download_jobs[job_id]
+        job['status'] = 'cancelled'
+    
+    part_path = job['path'] + '.part'
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    remove_download_state(job_id)
+
+def start_download(job_id):
+    with download_jobs_lock:
+        download_jobs[job_id]['status'] = 'queued'
+        download_cancel_events[job_id] = threading.Event()
+    download_executor.submit(run_download, job_id)
+
+def resume_interrupted_downloads():
+    """Queue again the downloads that were still running or queued when the server stopped"""
+    for name in os.listdir(DOWNLOAD_STATE_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(DOWNLOAD_STATE_DIR, name)) as f:
+                job = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable download state {name}: {e}")
+            continue
+        
+        with download_jobs_lock:
+            download_jobs[job['id']] = job
+        if job['status'] in ('queued', 'downloading'):
+            start_download(job['id'])
+        else:
+            download_cancel_events[job['id']] = threading.Event()
+
+def download_snapshot(job):
+    segments = job['segments'] or []
+    downloaded = sum(segment['done'] for segment in segments)
+    return {
+        'id': job['id'],
+        'url': job['url'],
+        'filename': job['filename'],
+        'path': to_rel_path(job['path']),
+        'status': job['status'],
+        'error': job['error'],
+        'total': job['total'],
+        'downloaded': downloaded,
+        'progress': round(downloaded * 100 / job['total'], 1) if job['total'] else None,
+        'connections': len(segments)
+    }
+
+@app.route('/api/downloads')
+@login_required
+def list_downloads():
+    with download_jobs_lock:
+        jobs = [download_snapshot(job) for job in download_jobs.values()]
+    return jsonify({"downloads": jobs})
+
+@app.route('/api/downloads/<job_id>')
+@login_required
+def get_download(job_id):
+    with download_jobs_lock:
+        job = download_jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "Download not found"}), 404
+        return jsonify(download_snapshot(job))
+
+@app.route('/api/downloads/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_download(job_id):
+    with download_jobs_lock:
+        job = download_jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "Download not found"}), 404
+        if job['status'] in ('completed', 'cancelled'):
+            return jsonify({"error": f"Download is already {job['status']}"}), 400
+        
+        download_cancel_events[job_id].set()
+        # A running job cleans up after its connections stop; others can be discarded now
+        running = job['status'] == 'downloading'
+    
+    if not running:
+        discard_download(job_id)
+    return jsonify({"success": True, "id": job_id})
+
+@app.route('/api/downloads/<job_id>/resume', methods=['POST'])
+@login_required
+def resume_download(job_id):
+    with download_jobs_lock:
+        job = download_jobs.get(job_id)
+        if not job:
+            return jsonify({"error": "Download not found"}), 404
+        if job['status'] != 'failed':
+            return jsonify({"error": "Only failed downloads can be resumed"}), 400
+    
+    start_download(job_id)
+    return jsonify({"success": True, "id": job_id})
+
 @app.route('/api/download-url', methods=['POST'])
 @login_required
 def download_url():
@@ -718,6 +1674,8 @@ def download_url():
         # Extract filename from URL
         from urllib.parse import urlparse, unquote, parse_qs
         parsed_url = urlparse(url)
+        if parsed_url.scheme not in ('http', 'https'):
+            return jsonify({"error": "Only http and https URLs can be downloaded"}), 400
         
         # First, check for a customName parameter in the query string
         filename = None
@@ -758,36 +1716,237 @@ def download_url():
         if len(unique_name) > 240:
             unique_name = f"download_{timestamp}{ext}"
         
-        # Call Internet Download Manager
-        idm_path = r"C:\Program Files (x86)\Internet Download Manager\IDMan.exe"
-        
-        # Check if IDM exists
-        if not os.path.exists(idm_path):
-            return jsonify({"error": "Internet Download Manager not found"}), 500
+        job_id = secrets.token_hex(8)
+        with download_jobs_lock:
+            download_jobs[job_id] = {
+                'id': job_id,
+                'url': url,
+                'path': os.path.join(target_dir, unique_name),
+                'filename': unique_name,
+                'status': 'queued',
+                'error': None,
+                'total': None,
+                'ranged': False,
+                'segments': None,
+                'saved_at': 0
+            }
+        start_download(job_id)
         
-        try:
-            # Use shell=False to avoid issues with special characters in URLs
-            subprocess.Popen([
-                idm_path, 
-                "/d", url,             # Download URL
-                "/p", target_dir,      # Download path
-                "/f", unique_name,     # Specify filename
-                "/n"                   # Add to download queue
-            ], shell=False)
-            
-            return jsonify({
-                "success": True,
-                "message": "URL sent to Internet Download Manager",
-                "url": url,
-                "path": target_dir,
-                "filename": unique_name
-            })
-        except Exception as e:
-            return jsonify({"error": f"Failed to start download: {str(e)}"}), 500
+        return jsonify({
+            "success": True,
+            "message": "Download started",
+            "id": job_id,
+            "url": url,
+            "path": target_dir,
+            "filename": unique_name
+        })
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
+# Hash functions run in worker processes, so they only take and return plain values
+def sample_file_hash(path):
+    """Hash the first and last DUPLICATE_SAMPLE_SIZE bytes of a file"""
+    try:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            digest.update(f.read(DUPLICATE_SAMPLE_SIZE))
+            if size > DUPLICATE_SAMPLE_SIZE:
+                f.seek(max(DUPLICATE_SAMPLE_SIZE, size - DUPLICATE_SAMPLE_SIZE))
+                digest.update(f.read(DUPLICATE_SAMPLE_SIZE))
+        return path, digest.hexdigest()
+    except OSError:
+        return path, None
+
+def full_file_hash(path):
+    try:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(DUPLICATE_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return path, digest.hexdigest()
+    except OSError:
+        return path, None
+
+duplicate_job = {'status': 'idle'}
+duplicate_job_lock = threading.Lock()
+
+def load_duplicate_cache():
+    try:
+        with open(DUPLICATE_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_duplicate_cache(cache):
+    # Files that were never hashed have nothing worth keeping
+    hashed = {path: entry for path, entry in cache.items() if entry['sample'] or entry['full']}
+    with open(DUPLICATE_CACHE_PATH + '.tmp', 'w') as f:
+        json.dump(hashed, f)
+    os.replace(DUPLICATE_CACHE_PATH + '.tmp', DUPLICATE_CACHE_PATH)
+
+def group_paths(paths, key):
+    """Group paths by key(path), keeping only groups with more than one member"""
+    groups = {}
+    for path in paths:
+        value = key(path)
+        if value is not None:
+            groups.setdefault(value, []).append(path)
+    return {value: members for value, members in groups.items() if len(members) > 1}
+
+def hash_into_cache(pool, paths, cache, field, hash_function):
+    """Fill cache[path][field], hashing in the pool only files whose cached hash is missing"""
+    todo = [path for path in paths if cache[path][field] is None]
+    with duplicate_job_lock:
+        duplicate_job['cached'] += len(paths) - len(todo)
+    
+    chunksize = max(1, min(64, len(todo) // (DUPLICATE_WORKERS * 4)))
+    saved_at = time.time()
+    for path, digest in pool.map(hash_function, todo, chunksize=chunksize):
+        cache[path][field] = digest
+        with duplicate_job_lock:
+            duplicate_job['hashed'] += 1
+        
+        if time.time() - saved_at > DUPLICATE_CACHE_SAVE_INTERVAL:
+            save_duplicate_cache(cache)
+            saved_at = time.time()
+
+def run_duplicate_scan(root):
+    cache = None
+    try:
+        # Cached hashes stay valid while a file's size and mtime are unchanged
+        cache = load_duplicate_cache()
+        sizes = {}
+        mtimes = {}
+        inodes = set()
+        
+        for dirpath, dirnames, filenames in os.walk(root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.islink(path):
+                        continue
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if stat.st_size == 0:
+                    continue
+                
+                # Hard links share their data, so only the first name for each inode is compared
+                inode = (stat.st_dev, stat.st_ino)
+                if stat.st_ino and inode in inodes:
+                    continue
+                inodes.add(inode)
+                
+                sizes[path] = stat.st_size
+                mtimes[path] = stat.st_mtime_ns
+            
+            with duplicate_job_lock:
+                duplicate_job['scanned'] = len(sizes)
+        
+        # Forget files under this root that no longer exist or have changed since they were hashed
+        prefix = os.path.join(root, '')
+        for path in [path for path in cache if path.startswith(prefix)]:
+            entry = cache[path]
+            if path not in sizes or entry['size'] != sizes[path] or entry['mtime'] != mtimes[path]:
+                del cache[path]
+        
+        # Only files sharing a size can be duplicates
+        candidates = [path for group in group_paths(sizes, sizes.get).values() for path in group]
+        for path in candidates:
+            cache.setdefault(path, {'size': sizes[path], 'mtime': mtimes[path], 'sample': None, 'full': None})
+        with duplicate_job_lock:
+            duplicate_job.update(phase='sampling', candidates=len(candidates))
+        
+        with ProcessPoolExecutor(max_workers=DUPLICATE_WORKERS) as pool:
+            hash_into_cache(pool, candidates, cache, 'sample', sample_file_hash)
+            sampled = group_paths(candidates, lambda path: (sizes[path], cache[path]['sample']) if cache[path]['sample'] else None)
+            
+            # Head and tail samples cover small files completely, so only larger ones need a full hash
+            large = [path for group in sampled.values() for path in group if sizes[path] > 2 * DUPLICATE_SAMPLE_SIZE]
+            with duplicate_job_lock:
+                duplicate_job['phase'] = 'hashing'
+            hash_into_cache(pool, large, cache, 'full', full_file_hash)
+        
+        def content_key(path):
+            digest = cache[path]['full'] if sizes[path] > 2 * DUPLICATE_SAMPLE_SIZE else cache[path]['sample']
+            return (sizes[path], digest) if digest else None
+        
+        matches = group_paths([path for group in sampled.values() for path in group], content_key)
+        groups = [{
+            'size': size,
+            'hash': digest,
+            'files': sorted(to_rel_path(path) for path in paths),
+            'wasted': size * (len(paths) - 1)
+        } for (size, digest), paths in matches.items()]
+        groups.sort(key=lambda group: group['wasted'], reverse=True)
+        
+        save_duplicate_cache(cache)
+        with duplicate_job_lock:
+            duplicate_job.update(status='completed', phase=None, groups=groups,
+                                 wasted=sum(group['wasted'] for group in groups), finished=time.time())
+    except Exception as e:
+        print(f"Error finding duplicates: {e}")
+        # Keep the hashes computed so far so the next scan doesn't repeat them
+        if cache is not None:
+            try:
+                save_duplicate_cache(cache)
+            except OSError as save_error:
+                print(f"Error saving duplicate hash cache: {save_error}")
+        with duplicate_job_lock:
+            duplicate_job.update(status='failed', error=str(e), finished=time.time())
+
+@app.route('/api/duplicates')
+@login_required
+def get_duplicates():
+    with duplicate_job_lock:
+        return jsonify(duplicate_job)
+
+@app.route('/api/duplicates/scan', methods=['POST'])
+@login_required
+def scan_duplicates():
+    data = request.get_json(silent=True)
+    path = data.get('path', '') if isinstance(data, dict) else ''
+    
+    if not isinstance(path, str):
+        return jsonify({"error": "path must be a string"}), 400
+    
+    # Prevent directory traversal attacks
+    target_dir = os.path.normpath(os.path.join(BASE_DIR, path))
+    if not target_dir.startswith(BASE_DIR):
+        return jsonify({"error": "Access denied"}), 403
+    
+    if is_restricted_path(target_dir):
+        return jsonify({"error": "Access denied"}), 403
+    
+    if not os.path.isdir(target_dir):
+        return jsonify({"error": "Invalid directory path"}), 400
+    
+    with duplicate_job_lock:
+        if duplicate_job['status'] == 'running':
+            return jsonify({"error": "A duplicate scan is already running"}), 409
+        
+        duplicate_job.clear()
+        duplicate_job.update({
+            'status': 'running',
+            'phase': 'scanning',
+            'path': path,
+            'scanned': 0,
+            'candidates': 0,
+            'hashed': 0,
+            'cached': 0,
+            'groups': [],
+            'wasted': 0,
+            'error': None,
+            'started': time.time(),
+            'finished': None
+        })
+    
+    threading.Thread(target=run_duplicate_scan, args=(target_dir,), daemon=True).start()
+    
+    return jsonify({"success": True, "path": path})
+
 if __name__ == '__main__':
     # Create needed directories
     os.makedirs('templates', exist_ok=True)
@@ -806,6 +1965,13 @@ if __name__ == '__main__':
         thumb_thread = threading.Thread(target=thumbnail_generator_thread, daemon=True)
         thumb_thread.start()
 
+    # Pick up URL downloads that were interrupted by the last shutdown
+    resume_interrupted_downloads()
+
+    # Start polling watched directories for live updates
+    watcher_thread = threading.Thread(target=directory_watcher_thread, daemon=True)
+    watcher_thread.start()
+
     # Get local IP address
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
@@ -1,3 +1,5 @@
+import { forgetThumbnail, lazyLoadThumbnail, releaseThumbnail } from './thumbnails.js';
+
 const fileGrid = document.getElementById('file-grid');
 const loading = document.getElementById('loading');
 const breadcrumb = document.getElementById('breadcrumb');
@@ -9,10 +11,22 @@ const closeMedia = document.getElementById('close-media');
 const errorDisplay = document.getElementById('error');
 const videoCountEl = document.getElementById('video-count');
 const imageCountEl = document.getElementById('image-count');
+const uploadStatusEl = document.getElementById('upload-status');
 
 export let currentPath = '';
 let isHomeDirectory = true;
 let isViewingMedia = false;
+let liveEvents = null;
+// Every entry of the open folder in display order; only the visible rows get DOM cards
+let gridItems = [];
+// Items keyed by path, so live events can patch them in place
+const gridEntries = new Map();
+// Cards currently in the DOM, keyed by item path
+let renderedCards = new Map();
+let renderedRange = { start: 0, end: 0 };
+let renderScheduled = false;
+// Rows rendered above and below the viewport so fast scrolling doesn't show gaps
+const OVERSCAN_ROWS = 3;
 
 // Load initial directory
 const initialPath = window.location.hash ? decodeURIComponent(window.location.hash.slice(1)) : '';
@@ -27,6 +41,10 @@ document.addEventListener('keydown', function (e) {
 
 });
 
+// Render the rows that scroll into view
+window.addEventListener('scroll', scheduleRender, { passive: true });
+window.addEventListener('resize', () => scheduleRender(true));
+
 // Close media viewer with close button
 closeMedia.addEventListener('click', function () {
     window.history.back();
@@ -66,7 +84,7 @@ window.addEventListener('popstate', function (event) {
 });
 export function loadDirectory(path, pushHistory = true) {
     loading.style.display = 'block';
-    fileGrid.innerHTML = '';
+    resetGrid();
     currentPath = path;
     isHomeDirectory = path === '';
 
@@ -74,9 +92,30 @@ export function loadDirectory(path, pushHistory = true) {
         history.pushState({ path }, '', `#${encodeURIComponent(path)}`);
     }
 
-    fetch(`/api/files?path=${encodeURIComponent(path)}`)
+    // Listing and stats in one round-trip; the server also warms the cache for subfolders
+    fetch('/api/batch', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            operations: [
+                { op: 'files', path: path, prefetch: true, format: 'compact' },
+                { op: 'stats', path: path }
+            ]
+        })
+    })
         .then(response => response.json())
-        .then(data => {
+        .then(batch => {
+            if (batch.error) {
+                showError(batch.error);
+                loading.style.display = 'none';
+                return;
+            }
+
+            const data = batch.results[0].data;
+            const stats = batch.results[1].data;
+
             if (data.error) {
                 showError(data.error);
                 return;
@@ -84,8 +123,13 @@ export function loadDirectory(path, pushHistory = true) {
 
             updateBreadcrumb(data.current_path);
 
+            const items = expandListing(data);
+            items.forEach(item => {
+                gridEntries.set(item.path, item);
+            });
+
             if (data.parent !== null) {
-                addFileCard({
+                items.unshift({
                     name: '..',
                     path: data.parent,
                     type: 'folder',
@@ -94,21 +138,18 @@ export function loadDirectory(path, pushHistory = true) {
                 });
             }
 
-            data.items.forEach(item => {
-                addFileCard(item);
-            });
-
+            gridItems = items;
             loading.style.display = 'none';
+            renderVisibleItems(true);
 
-            fetch(`/api/stats?path=${encodeURIComponent(path)}`)
-                .then(response => response.json())
-                .then(stats => {
-                    videoCountEl.textContent = stats.video_count;
-                    imageCountEl.textContent = stats.image_count;
-                })
-                .catch(error => {
-                    console.error("Error loading media stats:", error);
-                });
+            subscribeToDirectory(path);
+
+            if (stats.error) {
+                console.error("Error loading media stats:", stats.error);
+            } else {
+                videoCountEl.textContent = stats.video_count;
+                imageCountEl.textContent = stats.image_count;
+            }
         })
         .catch(error => {
             showError('Error loading directory: ' + error.message);
@@ -116,6 +157,228 @@ export function loadDirectory(path, pushHistory = true) {
         });
 }
 
+// Entry kinds and thumbnail states used by compact listings (see server.py)
+const KIND_FOLDER = 0, KIND_VIDEO = 2, KIND_IMAGE = 3;
+const THUMB_READY = 1, THUMB_PENDING = 2, THUMB_RESIZED = 3;
+
+function expandListing(data) {
+    if (data.format !== 'compact') {
+        return data.items;
+    }
+
+    const items = new Array(data.count);
+    for (let i = 0; i < data.count; i++) {
+        const name = data.name[i];
+        const path = data.prefix + name;
+        const kind = data.kind[i];
+
+        let thumbnail = null;
+        if (data.thumb[i] === THUMB_READY) {
+            thumbnail = `/api/thumbnail/${data.thumb_names[i]}`;
+        } else if (data.thumb[i] === THUMB_PENDING) {
+            thumbnail = '/static/icons/placeholder.jpg';
+        } else if (data.thumb[i] === THUMB_RESIZED) {
+            thumbnail = `/api/image/${path}?thumbnail=true`;
+        }
+
+        items[i] = {
+            name: name,
+            path: path,
+            type: kind === KIND_FOLDER ? 'folder' : 'file',
+            is_video: kind === KIND_VIDEO,
+            is_image: kind === KIND_IMAGE,
+            size: data.size[i],
+            extension: data.extension[i],
+            thumbnail: thumbnail
+        };
+    }
+    return items;
+}
+
+export function isLiveUpdating() {
+    return liveEvents !== null && liveEvents.readyState !== EventSource.CLOSED;
+}
+
+function subscribeToDirectory(path) {
+    if (liveEvents) {
+        liveEvents.close();
+        liveEvents = null;
+    }
+    if (!window.EventSource) {
+        return;
+    }
+
+    liveEvents = new EventSource(`/api/events?path=${encodeURIComponent(path)}`);
+
+    liveEvents.addEventListener('thumbnail', function (e) {
+        const data = JSON.parse(e.data);
+        const item = gridEntries.get(data.path);
+        if (item) {
+            item.thumbnail = data.thumbnail;
+            const card = renderedCards.get(data.path);
+            if (card) {
+                lazyLoadThumbnail(card.querySelector('.file-thumbnail img'), data.thumbnail);
+            }
+        }
+    });
+
+    liveEvents.addEventListener('added', function (e) {
+        upsertFileCard(JSON.parse(e.data));
+    });
+
+    liveEvents.addEventListener('changed', function (e) {
+        upsertFileCard(JSON.parse(e.data));
+    });
+
+    liveEvents.addEventListener('removed', function (e) {
+        const data = JSON.parse(e.data);
+        if (gridEntries.has(data.path)) {
+            adjustMediaCounts(removeGridItem(data.path), -1);
+            renderVisibleItems(true);
+        }
+    });
+
+    liveEvents.addEventListener('upload', function (e) {
+        const data = JSON.parse(e.data);
+        if (data.received < data.total) {
+            uploadStatusEl.textContent = `Receiving uploads (${data.received}/${data.total})`;
+        } else {
+            uploadStatusEl.textContent = `Received ${data.total} upload(s)`;
+            setTimeout(() => {
+                uploadStatusEl.textContent = '';
+            }, 3000);
+        }
+    });
+}
+
+function compareItems(a, b) {
+    // Same order as the server: folders first, then by lowercase name
+    const rankA = a.type === 'folder' ? 0 : 1;
+    const rankB = b.type === 'folder' ? 0 : 1;
+    if (rankA !== rankB) {
+        return rankA - rankB;
+    }
+    const nameA = a.name.toLowerCase();
+    const nameB = b.name.toLowerCase();
+    return nameA < nameB ? -1 : (nameA > nameB ? 1 : 0);
+}
+
+function upsertFileCard(item) {
+    if (gridEntries.has(item.path)) {
+        adjustMediaCounts(removeGridItem(item.path), -1);
+    }
+
+    // Binary search for the sorted position, keeping the '..' entry first
+    let low = gridItems.length > 0 && gridItems[0].name === '..' ? 1 : 0;
+    let high = gridItems.length;
+    while (low < high) {
+        const mid = (low + high) >> 1;
+        if (compareItems(gridItems[mid], item) < 0) {
+            low = mid + 1;
+        } else {
+            high = mid;
+        }
+    }
+
+    gridItems.splice(low, 0, item);
+    gridEntries.set(item.path, item);
+    adjustMediaCounts(item, 1);
+    renderVisibleItems(true);
+}
+
+function removeGridItem(path) {
+    const item = gridEntries.get(path);
+    gridEntries.delete(path);
+    gridItems.splice(gridItems.indexOf(item), 1);
+    if (item.thumbnail) {
+        forgetThumbnail(item.thumbnail);
+    }
+
+    // Drop the card so a changed entry is rebuilt from fresh data
+    const card = renderedCards.get(path);
+    if (card) {
+        releaseCard(card);
+        card.remove();
+        renderedCards.delete(path);
+    }
+    return item;
+}
+
+function resetGrid() {
+    renderedCards.forEach(releaseCard);
+    renderedCards = new Map();
+    renderedRange = { start: 0, end: 0 };
+    gridItems = [];
+    gridEntries.clear();
+    fileGrid.innerHTML = '';
+    fileGrid.style.paddingTop = '';
+    fileGrid.style.paddingBottom = '';
+}
+
+function scheduleRender(force = false) {
+    if (renderScheduled) {
+        return;
+    }
+    renderScheduled = true;
+    requestAnimationFrame(() => {
+        renderScheduled = false;
+        renderVisibleItems(force === true);
+    });
+}
+
+// Only rows near the viewport exist in the DOM; padding stands in for the rest
+function renderVisibleItems(force = false) {
+    const style = getComputedStyle(fileGrid);
+    const columns = Math.max(1, style.gridTemplateColumns.split(' ').length);
+    const rowStride = parseFloat(style.gridAutoRows) + parseFloat(style.rowGap);
+    const totalRows = Math.ceil(gridItems.length / columns);
+    const gridTop = fileGrid.getBoundingClientRect().top;
+
+    const firstRow = Math.min(totalRows, Math.max(0, Math.floor(-gridTop / rowStride) - OVERSCAN_ROWS));
+    const lastRow = Math.min(totalRows, Math.max(0, Math.ceil((window.innerHeight - gridTop) / rowStride) + OVERSCAN_ROWS));
+    const start = firstRow * columns;
+    const end = Math.min(gridItems.length, lastRow * columns);
+
+    if (!force && start === renderedRange.start && end === renderedRange.end) {
+        return;
+    }
+
+    const cards = new Map();
+    for (let i = start; i < end; i++) {
+        const item = gridItems[i];
+        const key = item.name === '..' ? '..' : item.path;
+        cards.set(key, renderedCards.get(key) || createFileCard(item));
+    }
+
+    renderedCards.forEach((card, key) => {
+        if (cards.get(key) !== card) {
+            releaseCard(card);
+        }
+    });
+
+    fileGrid.style.paddingTop = `${firstRow * rowStride}px`;
+    fileGrid.style.paddingBottom = `${Math.max(0, totalRows - lastRow) * rowStride}px`;
+    fileGrid.replaceChildren(...cards.values());
+
+    renderedCards = cards;
+    renderedRange = { start, end };
+}
+
+function releaseCard(card) {
+    const img = card.querySelector('.file-thumbnail img');
+    if (img) {
+        releaseThumbnail(img);
+    }
+}
+
+function adjustMediaCounts(item, delta) {
+    if (item.is_video) {
+        videoCountEl.textContent = Math.max(0, parseInt(videoCountEl.textContent, 10) + delta);
+    } else if (item.is_image) {
+        imageCountEl.textContent = Math.max(0, parseInt(imageCountEl.textContent, 10) + delta);
+    }
+}
+
 function updateBreadcrumb(pathParts) {
     while (breadcrumb.children.length > 1) {
         breadcrumb.removeChild(breadcrumb.lastChild);
@@ -192,7 +455,9 @@ function openMedia(type, path, name) {
     } else {
         video.style.display = 'none';
         image.style.display = 'block';
-        image.src = `/api/image/${encodeURIComponent(path)}`;
+        // Ask for a screen-sized copy and let the server prepare the neighbouring images too
+        const width = Math.round(window.innerWidth * (window.devicePixelRatio || 1));
+        image.src = `/api/image/${encodeURIComponent(path)}?w=${width}&neighbors=2`;
     }
 
     mediaViewer.classList.add('active');
@@ -201,7 +466,7 @@ function openMedia(type, path, name) {
     history.pushState({ media: true }, '', `#media/${encodeURIComponent(path)}`);
 }
 
-function addFileCard(item) {
+function createFileCard(item) {
     const card = document.createElement('div');
     card.className = 'file-card';
 
@@ -210,9 +475,12 @@ function addFileCard(item) {
 
     if (item.is_video || item.is_image) {
         const img = document.createElement('img');
-        img.src = item.thumbnail || (item.is_video ? `/static/icons/video.svg` : `/static/icons/image.svg`);
+        img.src = item.is_video ? `/static/icons/video.svg` : `/static/icons/image.svg`;
         img.alt = item.name;
         thumbnail.appendChild(img);
+        if (item.thumbnail) {
+            lazyLoadThumbnail(img, item.thumbnail);
+        }
 
         const overlay = document.createElement('div');
         overlay.className = 'play-overlay';
@@ -296,5 +564,5 @@ function addFileCard(item) {
         }
     });
 
-    fileGrid.appendChild(card);
+    return card;
 }
@@ -10,11 +10,16 @@ document.addEventListener('DOMContentLoaded', function () {
     const cancelDirectoryBtn = document.getElementById('cancel-directory-btn');
     const dirSelectorBreadcrumb = document.getElementById('dir-selector-breadcrumb');
 
+    const MAX_PREFETCHED_SUBDIRECTORIES = 24;
+
     let currentDirPath = "";
+    let prefetchedListings = new Map();
 
     // Open directory selector modal
     changeDirBtn.addEventListener('click', function () {
         dirSelectorModal.style.display = 'block';
+        // Listings prefetched during an earlier visit may be out of date
+        prefetchedListings = new Map();
         // Start with root directory or drives
         loadDirectoryContents('');
     });
@@ -86,56 +91,111 @@ document.addEventListener('DOMContentLoaded', function () {
     // Load directories for directory selector
     function loadDirectoryContents(path) {
         currentDirPath = path;
+
+        // Subfolders of the previous listing arrive with it, so going one level down needs no round-trip
+        const listing = prefetchedListings.get(path);
+        if (listing) {
+            renderDirectoryContents(path, listing);
+            return;
+        }
+
         dirLoading.style.display = 'block';
         dirListing.innerHTML = '';
 
-        fetch(`/api/directories?path=${encodeURIComponent(path)}`)
-            .then(response => response.json())
-            .then(data => {
-                if (data.error) {
-                    loadDirectoryContents(''); // Reset to root if error occurs
-                    showMessage(data.error, 'error');
-                    return;
-                }
-                console.log("curerent Path:", data.current_path, "Parent  :", data.parent,);
-                updateDirBreadcrumb(data.current_path);
-
-                dirListing.innerHTML = '';
-
-                // Add parent directory option if not at root
-                if (data.parent !== null) {
-                    const parentDir = createDirItem({
-                        name: '..',
-                        path: data.parent,
-                        type: 'parent'
-                    });
-                    dirListing.appendChild(parentDir);
+        fetchDirectoryListings([path])
+            .then(results => {
+                if (currentDirPath === path) {
+                    renderDirectoryContents(path, results[0].data);
                 }
+            })
+            .catch(error => {
+                showMessage(`Error loading directories: ${error.message}`, 'error');
+                dirLoading.style.display = 'none';
+            });
+    }
 
-                // Add drive options if at root
-                if (path === '' && data.drives && data.drives.length > 0) {
-                    data.drives.forEach(drive => {
-                        const driveItem = createDirItem({
-                            name: drive,
-                            path: drive,
-                            type: 'drive'
-                        });
-                        dirListing.appendChild(driveItem);
-                    });
-                } else {
-                    // Add directory options
-                    data.directories.forEach(dir => {
-                        const dirItem = createDirItem(dir);
-                        dirListing.appendChild(dirItem);
-                    });
+    // Several directory listings in one /api/batch round-trip
+    function fetchDirectoryListings(paths) {
+        return fetch('/api/batch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({
+                operations: paths.map(path => ({ op: 'directories', path: path }))
+            })
+        })
+            .then(response => response.json())
+            .then(batch => {
+                if (batch.error) {
+                    throw new Error(batch.error);
                 }
+                return batch.results;
+            });
+    }
 
-                dirLoading.style.display = 'none';
+    function prefetchSubdirectories(data) {
+        const paths = (data.drives || []).concat(data.directories.map(dir => dir.path))
+            .filter(path => !prefetchedListings.has(path))
+            .slice(0, MAX_PREFETCHED_SUBDIRECTORIES);
+        if (paths.length === 0) {
+            return;
+        }
+
+        fetchDirectoryListings(paths)
+            .then(results => {
+                results.forEach((result, index) => {
+                    if (result.status === 200) {
+                        prefetchedListings.set(paths[index], result.data);
+                    }
+                });
             })
             .catch(error => {
-                showMessage(`Error loading directories: ${error.message}`, 'error');
-                dirLoading.style.display = 'none';
+                console.error("Error prefetching directories:", error);
+            });
+    }
+
+    function renderDirectoryContents(path, data) {
+        if (data.error) {
+            loadDirectoryContents(''); // Reset to root if error occurs
+            showMessage(data.error, 'error');
+            return;
+        }
+        console.log("curerent Path:", data.current_path, "Parent  :", data.parent,);
+        updateDirBreadcrumb(data.current_path);
+
+        dirListing.innerHTML = '';
+
+        // Add parent directory option if not at root
+        if (data.parent !== null) {
+            const parentDir = createDirItem({
+                name: '..',
+                path: data.parent,
+                type: 'parent'
+            });
+            dirListing.appendChild(parentDir);
+        }
+
+        // Add drive options if at root
+        if (path === '' && data.drives && data.drives.length > 0) {
+            data.drives.forEach(drive => {
+                const driveItem = createDirItem({
+                    name: drive,
+                    path: drive,
+                    type: 'drive'
+                });
+                dirListing.appendChild(driveItem);
+            });
+        } else {
+            // Add directory options
+            data.directories.forEach(dir => {
+                const dirItem = createDirItem(dir);
+                dirListing.appendChild(dirItem);
             });
+        }
+
+        dirLoading.style.display = 'none';
+        prefetchSubdirectories(data);
     }
 
     function createDirItem(dir) {
@@ -0,0 +1,112 @@
+// Lazy thumbnail loading: only tiles near the viewport are fetched, a few at a time,
+// and fetches for tiles that scroll away (or are removed from the grid) are aborted.
+// Loaded thumbnails are kept as blob URLs so tiles that scroll back into view reuse them.
+const MAX_CONCURRENT_FETCHES = 6;
+const MAX_CACHED_THUMBNAILS = 500;
+
+const waiting = [];
+const active = new Map();
+const cached = new Map(); // thumbnail URL -> blob URL, least recently used first
+const observer = new IntersectionObserver(handleIntersections, { rootMargin: '200px 0px' });
+
+export function lazyLoadThumbnail(img, url) {
+    releaseThumbnail(img);
+    const objectUrl = cached.get(url);
+    if (objectUrl) {
+        cacheThumbnail(url, objectUrl);
+        img.src = objectUrl;
+        return;
+    }
+    img.dataset.thumbnail = url;
+    observer.observe(img);
+}
+
+export function releaseThumbnail(img) {
+    observer.unobserve(img);
+    cancelThumbnail(img);
+}
+
+// Drop a cached thumbnail whose file changed or was removed
+export function forgetThumbnail(url) {
+    const objectUrl = cached.get(url);
+    if (objectUrl) {
+        URL.revokeObjectURL(objectUrl);
+        cached.delete(url);
+    }
+}
+
+function cacheThumbnail(url, objectUrl) {
+    cached.delete(url);
+    cached.set(url, objectUrl);
+    while (cached.size > MAX_CACHED_THUMBNAILS) {
+        const [oldest, oldestObjectUrl] = cached.entries().next().value;
+        URL.revokeObjectURL(oldestObjectUrl);
+        cached.delete(oldest);
+    }
+}
+
+function handleIntersections(entries) {
+    entries.forEach(entry => {
+        const img = entry.target;
+        if (entry.isIntersecting) {
+            if (!active.has(img) && !waiting.includes(img)) {
+                waiting.push(img);
+            }
+        } else {
+            cancelThumbnail(img);
+        }
+    });
+    startFetches();
+}
+
+function cancelThumbnail(img) {
+    const index = waiting.indexOf(img);
+    if (index !== -1) {
+        waiting.splice(index, 1);
+    }
+
+    const controller = active.get(img);
+    if (controller) {
+        controller.abort();
+        active.delete(img);
+    }
+}
+
+function startFetches() {
+    while (active.size < MAX_CONCURRENT_FETCHES && waiting.length > 0) {
+        const img = waiting.shift();
+        const controller = new AbortController();
+        active.set(img, controller);
+
+        fetch(img.dataset.thumbnail, { signal: controller.signal })
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.blob();
+            })
+            .then(blob => {
+                if (active.get(img) !== controller) {
+                    return;
+                }
+                const url = img.dataset.thumbnail;
+                forgetThumbnail(url);
+                const objectUrl = URL.createObjectURL(blob);
+                cacheThumbnail(url, objectUrl);
+                img.src = objectUrl;
+                // Loaded once; no need to keep watching this tile
+                observer.unobserve(img);
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error("Error loading thumbnail:", error);
+                }
+            })
+            .finally(() => {
+                if (active.get(img) === controller) {
+                    active.delete(img);
+                }
+                startFetches();
+            });
+    }
+}
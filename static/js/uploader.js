@@ -1,4 +1,4 @@
-import { currentPath, loadDirectory } from './index.js';
+import { currentPath, loadDirectory, isLiveUpdating } from './index.js';
 
 document.addEventListener('DOMContentLoaded', function () {
     // Upload Modal functionality
@@ -56,7 +56,7 @@ document.addEventListener('DOMContentLoaded', function () {
             
             const customFolder = document.getElementById('custom-folder').value.trim() || 'uploads';
             
-            // Send the URL to the server for IDM processing
+            // Queue the URL with the server's download manager
             fetch('/api/download-url', {
                 method: 'POST',
                 headers: {
@@ -73,8 +73,9 @@ document.addEventListener('DOMContentLoaded', function () {
                 if (data.error) {
                     showUploadMessage(`Error: ${data.error}`, 'error');
                 } else {
-                    showUploadMessage(`URL sent to Internet Download Manager`, 'success');
+                    showUploadMessage(`Download queued: ${data.filename}`, 'success');
                     urlInput.value = ''; // Clear input on success
+                    trackDownload(data.id, data.filename);
                 }
             })
             .catch(error => {
@@ -83,6 +84,30 @@ document.addEventListener('DOMContentLoaded', function () {
         });
     }
 
+    // Poll the download job and show its progress until it finishes
+    function trackDownload(id, filename) {
+        fetch(`/api/downloads/${id}`)
+            .then(response => response.json())
+            .then(job => {
+                if (job.error && job.status === undefined) {
+                    showUploadMessage(`Error: ${job.error}`, 'error');
+                } else if (job.status === 'completed') {
+                    showUploadMessage(`Downloaded ${filename}`, 'success');
+                } else if (job.status === 'failed') {
+                    showUploadMessage(`Download failed: ${job.error}`, 'error');
+                } else if (job.status === 'cancelled') {
+                    showUploadMessage(`Download cancelled: ${filename}`, 'error');
+                } else {
+                    const progress = job.progress !== null ? `${job.progress}%` : formatFileSize(job.downloaded);
+                    showUploadMessage(`Downloading ${filename}: ${progress}`, 'success');
+                    setTimeout(() => trackDownload(id, filename), 1000);
+                }
+            })
+            .catch(error => {
+                showUploadMessage(`Failed to get download progress: ${error}`, 'error');
+            });
+    }
+
     function displaySelectedFiles(files) {
         uploadQueue.innerHTML = '';
 
@@ -194,9 +219,12 @@ document.addEventListener('DOMContentLoaded', function () {
         let uploadedCount = 0;
         let failedCount = 0;
 
+        // Lets the server report progress across the whole batch, not just one request
+        const batch = { id: `${Date.now()}-${Math.random().toString(36).slice(2)}`, total: files.length };
+
         // Process each file with its own XHR
         for (let i = 0; i < files.length; i++) {
-            uploadSingleFile(files[i], (success) => {
+            uploadSingleFile(files[i], batch, (success) => {
                 if (success) uploadedCount++; else failedCount++;
 
                 // When all files have been processed
@@ -207,19 +235,23 @@ document.addEventListener('DOMContentLoaded', function () {
                         showUploadMessage(`Uploaded ${uploadedCount} file(s), ${failedCount} failed`, 'error');
                     }
 
-                    // Reload the current directory after all uploads complete
-                    setTimeout(() => {
-                        loadDirectory(currentPath, false);
-                    }, 1500);
+                    // Live events already patched the grid; only reload without them
+                    if (!isLiveUpdating()) {
+                        setTimeout(() => {
+                            loadDirectory(currentPath, false);
+                        }, 1500);
+                    }
                 }
             });
         }
     }
 
-    function uploadSingleFile(file, callback) {
+    function uploadSingleFile(file, batch, callback) {
         const formData = new FormData();
         formData.append('file', file);
         formData.append('current_dir', currentPath);
+        formData.append('batch_id', batch.id);
+        formData.append('batch_total', batch.total);
 
         // Get the custom folder name
         const customFolder = document.getElementById('custom-folder').value.trim();